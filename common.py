@@ -1,10 +1,12 @@
 import os, sys, unicodedata
 
 from math import fabs, sqrt, radians
+from operator import attrgetter
 
 from dataclasses import dataclass
 
 import bmesh
+import numpy as np
 from bmesh.types import BMFace, BMEdge, BMesh
 from mathutils import Vector, Matrix
 
@@ -109,34 +111,6 @@ def flatten(t):
     return [item for sublist in t for item in sublist]
 
 
-def measure_all_faces_uv_area(bm, uv_layer):
-    """From MagicUV"""
-    triangle_loops = bm.calc_loop_triangles()
-
-    areas = {face: 0.0 for face in bm.faces}
-
-    for loops in triangle_loops:
-        face = loops[0].face
-        area = areas[face]
-        area += calc_tris_2d_area([l[uv_layer].uv for l in loops])
-        areas[face] = area
-
-    return areas
-
-
-def calc_tris_2d_area(points):
-    """From MagicUV"""
-    area = 0.0
-    for i, p1 in enumerate(points):
-        p2 = points[(i + 1) % len(points)]
-        v1 = p1 - points[0]
-        v2 = p2 - points[0]
-        a = v1.x * v2.y - v1.y * v2.x
-        area = area + a
-
-    return fabs(0.5 * area)
-
-
 def vert_between_edges(edge_a, edge_b):
     if edge_a.verts[0] in edge_b.verts:
         return edge_a.verts[0]
@@ -198,6 +172,19 @@ def uvs_translate_rotate_scale(
     uvs_transform(faces, uv_layer, matrix)
 
 
+def uvs_translate(faces, uv_layer, translate: Vector):
+    """
+    Move all UVs in the given faces, cheaper than
+    uvs_transform for a translation only.
+    """
+    tx, ty = translate.x, translate.y
+    for face in faces:
+        for loop_uv in face.loops:
+            uv = loop_uv[uv_layer].uv
+            uv.x += tx
+            uv.y += ty
+
+
 def uvs_transform(
     faces,
     uv_layer,
@@ -206,24 +193,62 @@ def uvs_transform(
     """
     Transform all UV coordsin the given faces using the given matrix
     """
+    # Unpack the matrix into plain floats once, so the loop below doesn't
+    # allocate a Vector per UV. UVs are treated as homogeneous (u, v, 1),
+    # for a 4x4 matrix w = 1 as well, so its last two columns are summed.
+    (a, b, *c), (d, e, *f), (g, h, *i) = transformation[:3]
+    c, f, i = sum(c), sum(f), sum(i)
+    is_affine = g == 0 and h == 0 and i == 1
+
     for face in faces:
         for loop_uv in face.loops:
             uv = loop_uv[uv_layer].uv
-            uv = uv.to_3d()
-            uv.z = 1
-            transformed = (transformation @ uv)
-            transformed /= transformed.z
-            loop_uv[uv_layer].uv = transformed.xy
+            x = uv.x
+            y = uv.y
+            tx = a * x + b * y + c
+            ty = d * x + e * y + f
+            if not is_affine:
+                tz = g * x + h * y + i
+                tx /= tz
+                ty /= tz
+            uv.x = tx
+            uv.y = ty
 
 def uvs_scale(
     faces,
     uv_layer,
     scale: Vector
     ):
+    """
+    Scale all UVs in the given faces, scale is either
+    a number or a Vector (per axis)
+    """
+    if isinstance(scale, (int, float)):
+        sx = sy = scale
+    else:
+        sx, sy = scale.x, scale.y
+
+    # Scale in place instead of building a new Vector for every UV
     for face in faces:
         for loop_uv in face.loops:
             uv = loop_uv[uv_layer].uv
-            loop_uv[uv_layer].uv = scale * uv
+            uv.x *= sx
+            uv.y *= sy
+
+
+def mesh_uvs_scale(mesh, scale: float):
+    """
+    Scale the UVs of the active UV map of a mesh that is NOT in edit mode.
+    Works on the mesh data directly (with numpy), no bmesh needed.
+    """
+    if mesh.uv_layers.active is None:
+        return
+    uv_data = mesh.uv_layers.active.data
+    uvs = np.empty(len(uv_data) * 2, dtype=np.float32)
+    uv_data.foreach_get("uv", uvs)
+    uvs *= scale
+    uv_data.foreach_set("uv", uvs)
+    mesh.update()
 
 
 def uvs_snap_to_texel_corner(faces, uv_layer, texture_size, skip_pinned=False):
@@ -235,11 +260,36 @@ def uvs_snap_to_texel_corner(faces, uv_layer, texture_size, skip_pinned=False):
                 uv.y = round(uv.y * texture_size) / texture_size
 
 
-def uvs_scale_texel_density(bm, faces, uv_layer, texture_size, target_density):
-    mesh_face_area = sum(face.calc_area() for face in faces)
+def calc_face_uv_area(face, uv_layer):
+    """
+    UV area of a single face, with the shoelace formula (relative to its
+    first loop). The signed areas are summed, so concave faces are correct.
+    Avoids triangulating the entire mesh when only a few faces are needed.
+    """
+    loops = face.loops
+    p0 = loops[0][uv_layer].uv
+    x0 = p0.x
+    y0 = p0.y
+    area = 0.0
+    p1 = loops[1][uv_layer].uv
+    x1 = p1.x - x0
+    y1 = p1.y - y0
+    for i in range(2, len(loops)):
+        p2 = loops[i][uv_layer].uv
+        x2 = p2.x - x0
+        y2 = p2.y - y0
+        area += x1 * y2 - y1 * x2
+        x1 = x2
+        y1 = y2
+    return fabs(0.5 * area)
 
-    uv_face_areas = measure_all_faces_uv_area(bm, uv_layer)
-    uv_face_area = sum(uv_face_areas[face] for face in faces)
+
+def uvs_scale_texel_density(bm, faces, uv_layer, texture_size, target_density):
+    mesh_face_area = 0.0
+    uv_face_area = 0.0
+    for face in faces:
+        mesh_face_area += face.calc_area()
+        uv_face_area += calc_face_uv_area(face, uv_layer)
     uv_face_area *= texture_size * texture_size
 
     current_density = sqrt(uv_face_area) / sqrt(mesh_face_area)
@@ -254,13 +304,6 @@ def uvs_pin(faces, uv_layer, pin=True):
             loop_uv[uv_layer].pin_uv = pin
 
 
-def any_pinned(faces, uv_layer):
-    for face in faces:
-        for loop_uv in face.loops:
-            if loop_uv[uv_layer].pin_uv:
-                return True
-    return False
-
 LOCK_ORIENTATION_ATTRIBUTE = "pixunwrap_lock_orientation"
 
 def lock_orientation(mesh, face_indices, is_locked):
@@ -274,33 +317,27 @@ def lock_orientation(mesh, face_indices, is_locked):
         face[lock_layer] = 1 if is_locked else 0
     # print([face[lock_layer] for face in self.mesh.faces])
 
+
+def get_selected_faces(bm: "BMesh") -> "list[BMFace]":
+    """
+    All selected faces of the mesh
+    """
+    return list(filter(attrgetter("select"), bm.faces))
+
+
 def is_outer_edge_of_selection(edge):
     return (
         len(list(edge_face for edge_face in edge.link_faces if edge_face.select)) <= 1
     )
 
-def get_bmesh(obj) -> "BMesh":
-    """
-    Get a BMesh from the given object, will use either
-    `bmesh.from_edit_mesh` or `from_mesh`, depending on 
-    whether object is in Edit mode
-    """
-    if obj.data.is_editmode:
-        bm = bmesh.from_edit_mesh(obj.data)
-    else:
-        bm = bmesh.new()
-        bm.from_mesh(obj.data)
-    return bm
 
-def update_and_free_bmesh(obj, bm:"BMesh"):
+def show_image_in_editors(screen, image):
     """
-    updates mesh data on the given object. 
+    Show the image in all Image Editors (e.g. the UV Editor) on the screen
     """
-    if obj.data.is_editmode:
-        bmesh.update_edit_mesh(obj.data)
-    else:
-        bm.to_mesh(obj.data)
-        bm.free()
+    for area in screen.areas:
+        if area.type == "IMAGE_EDITOR":
+            area.spaces.active.image = image
 
 
 def find_texture(obj, face=None, tex_layer=None):
@@ -338,6 +375,20 @@ def find_all_textures(obj, face=None, tex_layer=None):
     return images
 
 
+def object_uses_texture(obj, texture):
+    """
+    Same as `texture in find_all_textures(obj)`, but stops
+    walking the material nodes as soon as the texture is found.
+    """
+    for slot in obj.material_slots:
+        if slot.material and slot.material.node_tree:
+            for node in slot.material.node_tree.nodes:
+                if node.type in ["TEX_ENVIRONMENT", "TEX_IMAGE"]:
+                    if node.image == texture:
+                        return True
+    return False
+
+
 def dump(obj):
     for attr in dir(obj):
         if hasattr(obj, attr):
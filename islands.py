@@ -1,5 +1,6 @@
 from math import ceil, floor
 from collections import defaultdict
+from heapq import heappop, heappush
 from typing import Any
 
 import bmesh
@@ -7,7 +8,7 @@ from bmesh.types import BMesh, BMFace
 
 from mathutils import Vector
 
-from .common import LOCK_ORIENTATION_ATTRIBUTE, Vector2Int, RectInt, any_pinned, elem_max, elem_min
+from .common import LOCK_ORIENTATION_ATTRIBUTE, Vector2Int, RectInt, elem_max, elem_min, get_selected_faces
 
 
 class UVFace:
@@ -21,23 +22,6 @@ class UVFace:
         self.face = face
         self.uv_layer = uv_layer
 
-    def calc_info(self):
-        ma = Vector((-10000000.0, -10000000.0))
-        mi = Vector((10000000.0, 10000000.0))
-        center = Vector((0, 0))
-
-        for l in self.face.loops:
-            uv = l[self.uv_layer].uv
-            ma.x = max(uv.x, ma.x)
-            ma.y = max(uv.y, ma.y)
-            mi.x = min(uv.x, mi.x)
-            mi.y = min(uv.y, mi.y)
-            center += uv
-
-        center /= len(self.face.loops)
-        self.min = mi
-        self.max = ma
-
 
 class UVIsland:
     """Set of UV faces, usually an Island"""
@@ -49,7 +33,10 @@ class UVIsland:
     max: Vector
     min: Vector
     average_uv: Vector
+    any_pinned: bool
     # pixel_bounds: RectInt = None
+    # (texture_size, min_padding, RectInt) of the last calc_pixel_bounds
+    _pixel_bounds_cache: tuple = None
     uv_layer: any
 
     def __init__(self, bmfaces: "list[BMFace]", mesh: "BMesh", uv_layer):
@@ -63,24 +50,54 @@ class UVIsland:
         Update the min/max values of this island
         based on the faces it contains
         """
-        self.max = Vector((-10000000.0, -10000000.0))
-        self.min = Vector((10000000.0, 10000000.0))
-        self.average_uv = Vector((0.0, 0.0))
-        self.num_uv = 0
+        # Single pass over all loops using plain floats,
+        # per-face bounds and pin state are stored along the way.
+        uv_layer = self.uv_layer
+        pinned = False
+        min_x = min_y = 10000000.0
+        max_x = max_y = -10000000.0
+        sum_x = sum_y = 0.0
+        num_uv = 0
         for face in self.uv_faces:
-            face.calc_info()
-
-            self.average_uv += sum(
-                (l[self.uv_layer].uv for l in face.face.loops), Vector((0, 0))
-            )
-            self.num_uv += len(face.face.loops)
-
-            self.max.x = max(face.max.x, self.max.x)
-            self.max.y = max(face.max.y, self.max.y)
-            self.min.x = min(face.min.x, self.min.x)
-            self.min.y = min(face.min.y, self.min.y)
-
-        self.average_uv /= self.num_uv
+            face_min_x = face_min_y = 10000000.0
+            face_max_x = face_max_y = -10000000.0
+            for l in face.face.loops:
+                loop_uv = l[uv_layer]
+                if loop_uv.pin_uv:
+                    pinned = True
+                uv = loop_uv.uv
+                x = uv.x
+                y = uv.y
+                sum_x += x
+                sum_y += y
+                num_uv += 1
+                if x < face_min_x:
+                    face_min_x = x
+                if x > face_max_x:
+                    face_max_x = x
+                if y < face_min_y:
+                    face_min_y = y
+                if y > face_max_y:
+                    face_max_y = y
+
+            face.min = Vector((face_min_x, face_min_y))
+            face.max = Vector((face_max_x, face_max_y))
+
+            if face_min_x < min_x:
+                min_x = face_min_x
+            if face_max_x > max_x:
+                max_x = face_max_x
+            if face_min_y < min_y:
+                min_y = face_min_y
+            if face_max_y > max_y:
+                max_y = face_max_y
+
+        self.min = Vector((min_x, min_y))
+        self.max = Vector((max_x, max_y))
+        self.num_uv = num_uv
+        self.any_pinned = pinned
+        self._pixel_bounds_cache = None
+        self.average_uv = Vector((sum_x / num_uv, sum_y / num_uv))
 
     def calc_pixel_bounds(self, texture_size, min_padding=0.3):
         """
@@ -89,15 +106,24 @@ class UVIsland:
         Useful when manipulating the texture based on islands,
         or when finding free space
         """
-        xmin = floor(self.min.x * texture_size - min_padding)
-        ymin = floor(self.min.y * texture_size - min_padding)
-        xmax = ceil(self.max.x * texture_size + min_padding)
-        ymax = ceil(self.max.y * texture_size + min_padding)
-
-        mi = Vector2Int(xmin, ymin)
-        ma = Vector2Int(xmax, ymax)
+        # Bounds only change in update_min_max and merge, which reset this
+        cache = self._pixel_bounds_cache
+        if cache is not None and cache[0] == texture_size and cache[1] == min_padding:
+            return cache[2]
+
+        mi, ma = self.min, self.max
+        mi = Vector2Int(
+            floor(mi.x * texture_size - min_padding),
+            floor(mi.y * texture_size - min_padding),
+        )
+        ma = Vector2Int(
+            ceil(ma.x * texture_size + min_padding),
+            ceil(ma.y * texture_size + min_padding),
+        )
 
-        return RectInt(mi, ma)
+        rect = RectInt(mi, ma)
+        self._pixel_bounds_cache = (texture_size, min_padding, rect)
+        return rect
 
     def merge(self, other: "UVIsland"):
         self.max = elem_max(self.max, other.max)
@@ -110,6 +136,8 @@ class UVIsland:
 
         self.uv_faces.extend(other.uv_faces)
         self.num_uv += other.num_uv
+        self._pixel_bounds_cache = None
+        self.any_pinned = self.any_pinned or other.any_pinned
 
         # if self.pixel_bounds is not None and other.pixel_bounds is not None:
         #     self.pixel_bounds.encapsulate(other.pixel_bounds)
@@ -118,19 +146,17 @@ class UVIsland:
         return (uv_face.face for uv_face in self.uv_faces)
 
     def is_any_pinned(self):
-        return any_pinned(self.get_faces(), self.mesh.loops.layers.uv.verify())
+        return self.any_pinned
 
     def is_any_orientation_locked(self):
-        # try:
         lock_layer = self.mesh.faces.layers.int.get(LOCK_ORIENTATION_ATTRIBUTE)
         if lock_layer is None:
+            # If the layer doesn't exist, no faces are locked
             return False
-        # print(f"{lock_layer=}")
-        # except AttributeError:
-        #     #if the layer doesn't exist, no faces are locked
-        #     return False
-        # print([face[lock_layer] for face in self.get_faces()])
-        return any(face[lock_layer] == 1 for face in self.get_faces())
+        for uv_face in self.uv_faces:
+            if uv_face.face[lock_layer] == 1:
+                return True
+        return False
 
 
 def get_islands_from_obj(obj, only_selected=True) -> "list[UVIsland]":
@@ -151,24 +177,46 @@ def get_islands_from_mesh(mesh: "BMesh", only_selected=True) -> "list[UVIsland]"
     uv_layer = mesh.loops.layers.uv.verify()
 
     if only_selected:
-        selected_faces = [f for f in mesh.faces if f.select]
+        selected_faces = get_selected_faces(mesh)
     else:
         selected_faces = [f for f in mesh.faces]
 
     return get_islands_for_faces(mesh, selected_faces, uv_layer)
 
 
-def get_islands_for_faces(mesh: "BMesh", faces, uv_layer) -> "list[UVIsland]":
+def get_islands_by_selection(mesh: "BMesh", uv_layer):
+    """
+    Find the islands of all faces in the mesh in a single pass,
+    selected and unselected faces are never joined into one island.
+    Returns a tuple of (selected islands, unselected islands)
+    """
+    islands = get_islands_for_faces(mesh, mesh.faces, uv_layer, split_selection=True)
+    selected_islands = []
+    other_islands = []
+    for island in islands:
+        if island.uv_faces[0].face.select:
+            selected_islands.append(island)
+        else:
+            other_islands.append(island)
+    return selected_islands, other_islands
+
+
+def get_islands_for_faces(
+    mesh: "BMesh", faces, uv_layer, split_selection=False
+) -> "list[UVIsland]":
     # Build two lookups for
     # all verts that makes up a face
     # all faces using a vert
     # Lookups are by INDEX'
+    # If split_selection is set, the selection state is part of the vert id
+    # so that selected faces don't connect to unselected ones
     mesh.faces.ensure_lookup_table()
     face_to_verts = defaultdict(set)
     vert_to_faces = defaultdict(set)
     for f in faces:
+        select = split_selection and f.select
         for l in f.loops:
-            id_ = l[uv_layer].uv.to_tuple(5), l.vert.index
+            id_ = l[uv_layer].uv.to_tuple(5), l.vert.index, select
             face_to_verts[f.index].add(id_)
             vert_to_faces[id_].add(f.index)
 
@@ -195,34 +243,66 @@ def get_islands_for_faces(mesh: "BMesh", faces, uv_layer) -> "list[UVIsland]":
 
 def merge_overlapping_islands(islands: "list[UVIsland]") -> "list[UVIsland]":
     """
-    Check each pair of islands to see if their (pixel) bounding boxes overlap
-    Merges them if they do
+    Merge islands whose bounding boxes overlap (or touch).
+    Merged islands have bigger bounds, that can overlap other islands again,
+    so this repeats until no bounds overlap anymore.
+    Each merged island is kept in the place of its first island.
     """
-    i = 0
-    while i < len(islands):
-        island_i = islands[i]
-        j = i + 1
-        while j < len(islands):
-            island_j = islands[j]
-            # See if the islands's bounds overlap eachother
-            if not (
-                island_j.min.x > island_i.max.x
-                or island_i.min.x > island_j.max.x
-                or island_j.min.y > island_i.max.y
-                or island_i.min.y > island_j.max.y
-            ):
-                island_i.merge(island_j)
-                del islands[j]
-                # start over because we want to know if the merged
-                # island now overlaps something else
-                j = i + 1
-            else:
-                # either the list gets shorter, or we move
-                # up one index
-                j += 1
-        i += 1
+    while True:
+        groups = find_overlapping_groups(islands)
+        if len(groups) == len(islands):
+            return islands
 
-    return islands
+        merged_islands = []
+        for group in groups:
+            island = islands[group[0]]
+            for other_idx in group[1:]:
+                island.merge(islands[other_idx])
+            merged_islands.append(island)
+        islands = merged_islands
+
+
+def find_overlapping_groups(islands: "list[UVIsland]") -> "list[list[int]]":
+    """
+    Group the islands (by index) whose bounding boxes overlap,
+    directly or through other islands in the group.
+    Sweeps over the islands from left to right, so only islands that
+    overlap on the x axis are compared with each other.
+    Groups are sorted, and ordered by their first index.
+    """
+    parent = list(range(len(islands)))
+
+    def find_root(idx):
+        while parent[idx] != idx:
+            parent[idx] = parent[parent[idx]]
+            idx = parent[idx]
+        return idx
+
+    order = sorted(range(len(islands)), key=lambda idx: islands[idx].min.x)
+    # Islands that the sweep line currently crosses,
+    # and a heap of (max x, index) to find the ones that it has passed
+    active = set()
+    active_ends = []
+    for idx in order:
+        island = islands[idx]
+        while active_ends and active_ends[0][0] < island.min.x:
+            active.discard(heappop(active_ends)[1])
+
+        for other_idx in active:
+            other = islands[other_idx]
+            # Active islands all overlap this one on x, only check y
+            if not (other.min.y > island.max.y or island.min.y > other.max.y):
+                root, other_root = find_root(idx), find_root(other_idx)
+                if root != other_root:
+                    parent[max(root, other_root)] = min(root, other_root)
+
+        active.add(idx)
+        heappush(active_ends, (island.max.x, idx))
+
+    groups = defaultdict(list)
+    for idx in range(len(islands)):
+        groups[find_root(idx)].append(idx)
+    return sorted(groups.values())
 
 
 def get_connected_components(nodes, get_connections_for_node):
@@ -237,15 +317,18 @@ def get_connected_components(nodes, get_connections_for_node):
 
     connected_components = []
     while remaining:
-        node = next(iter(remaining))
-        current_component = []
+        node = remaining.pop()
+        current_component = [node]
         nodes_to_add = [node]
         while nodes_to_add:
             node_to_add = nodes_to_add.pop()
-            if node_to_add in remaining:
-                remaining.remove(node_to_add)
-                current_component.append(node_to_add)
-                nodes_to_add.extend(get_connections_for_node(node_to_add))
+            # Only queue nodes that weren't visited yet, `remaining`
+            # doubles as the visited set.
+            for connected in get_connections_for_node(node_to_add):
+                if connected in remaining:
+                    remaining.remove(connected)
+                    current_component.append(connected)
+                    nodes_to_add.append(connected)
 
         connected_components.append(current_component)
     return connected_components
@@ -281,22 +364,45 @@ def connected_faces(face):
                     yield other_face
 
 
+def find_linked_groups(groups):
+    """
+    Find the groups (lists of faces) that are connected to a face of
+    another group (by an edge that isn't a seam).
+    Returns a set with the indices of those groups.
+    """
+    group_of_face = {}
+    for i, group in enumerate(groups):
+        for face in group:
+            group_of_face[face] = i
+
+    linked = set()
+    for i, group in enumerate(groups):
+        for face in group:
+            for other_face in connected_faces(face):
+                other_group = group_of_face.get(other_face, i)
+                if other_group != i:
+                    linked.add(i)
+                    linked.add(other_group)
+    return linked
+
+
 def find_closest_group(faces, groups):
     output = [list() for _ in range(len(groups))]
+    # Face centers don't change, so compute them once instead of
+    # for every (face, group_face) pair
+    group_centers = [
+        [group_face.calc_center_bounds() for group_face in group] for group in groups
+    ]
     for face in faces:
-        print(f"==== Finding closest group for {face.index}")
+        center = face.calc_center_bounds()
         closest_dist = float("inf")
         closest = -1
-        for i, group in enumerate(groups):
-            for group_face in group:
-                dist = (
-                    face.calc_center_bounds() - group_face.calc_center_bounds()
-                ).length_squared
-                print(f"distance to {i}/{group_face.index} is {dist}")
+        for i, centers in enumerate(group_centers):
+            for group_center in centers:
+                dist = (center - group_center).length_squared
                 if dist < closest_dist:
                     closest_dist = dist
                     closest = i
 
-        print(f"Closest distance was {closest_dist} for group {closest}")
         output[closest].append(face)
     return output
@@ -1,18 +1,31 @@
 from cgitb import text
 from math import cos, sin, pi
-import random
+from operator import attrgetter
 
 import bpy
 import bmesh
-from mathutils import Vector
+import numpy as np
+from mathutils import Matrix, Vector
 
 
 from .common import *
 from .texture import PixelArray, copy_texture_region, copy_texture_region_transformed
-from .packing import find_free_space_for_island, pack_rects
+from .packing import (
+    find_free_space_for_island,
+    find_free_space_for_rect,
+    pack_rects,
+    pack_rects_maxrects,
+    pack_rects_shelf,
+)
 from .islands import *
 from .grids import Grid, GridBuildException, GridSnapModes
 
+# Exact (homogeneous 2D) rotation and flip matrices, Matrix.Rotation leaves
+# tiny errors in the zeros. Copy before modifying, e.g. with matrix_pin_pivot
+ROTATE_90 = Matrix(((0, -1, 0), (1, 0, 0), (0, 0, 1)))
+FLIP_X = Matrix.Diagonal((-1, 1, 1))
+FLIP_Y = Matrix.Diagonal((1, -1, 1))
+
 
 class TextureOperator:
     
@@ -28,6 +41,7 @@ class TextureOperator:
     def find_texture(self, context):
         self.texture = find_texture(context.view_layer.objects.active)
         self.texture_size = self.texture.size[0]
+        self.objects_with_texture = None
 
     def error_if_texture_dirty(self):
         if self.texture.is_dirty:
@@ -53,14 +67,132 @@ class TextureOperator:
             return True
         return False
 
+    def selection_to_free_space(
+        self,
+        context,
+        obj,
+        bm: "BMesh",
+        uv_layer,
+        modify_texture=False,
+        move_entire_island=True,
+        ignore_unpinned_islands=True,
+        prefer_current_position=False,
+        include_other_objects=True,
+        occupied_islands=None,
+    ):
+        """
+        Move the selected islands of the (edit mode) bmesh to a free section
+        on the UV map, see PIXUNWRAP_OT_island_to_free_space for the options.
+        Operators can call this directly on a bmesh they already have,
+        instead of going through bpy.ops. Doesn't update the edit mesh.
+        If occupied_islands is given, only the islands of the selected faces
+        are found, and they are placed around occupied_islands (which the
+        placed islands are added to) instead of all other islands.
+        Returns False if an error was reported.
+        """
+        # FIND ISLANDS
+
+        if occupied_islands is not None:
+            selected_islands = get_islands_from_mesh(bm, True)
+            all_islands = occupied_islands
+        elif not move_entire_island:
+            selected_islands, all_islands = get_islands_by_selection(bm, uv_layer)
+        else:
+            all_islands = get_islands_from_obj(obj, False)
+            # Collect the selected faces once, then test each island with
+            # a set operation (no per face attribute access in Python)
+            selected_faces = set(get_selected_faces(bm))
+            face_of = attrgetter("face")
+            selected_islands = [
+                isl
+                for isl in all_islands
+                if not selected_faces.isdisjoint(map(face_of, isl.uv_faces))
+            ]
+
+        selected_islands = merge_overlapping_islands(selected_islands)
+
+        if occupied_islands is None:
+            all_islands = self.find_occupied_islands(
+                context,
+                obj,
+                all_islands,
+                ignore_unpinned_islands=ignore_unpinned_islands,
+                include_other_objects=include_other_objects,
+            )
+
+        for island in selected_islands:
+            pixel_bounds_old = island.calc_pixel_bounds(self.texture_size)
+            old_pos = pixel_bounds_old.min
+
+            new_pos = find_free_space_for_island(
+                island, all_islands, self.texture_size, prefer_current_position
+            )
+            moved = new_pos != old_pos
+
+            # Do texture modification first because it could error + cancel the operator
+            if modify_texture and moved:
+                if self.error_if_out_of_bounds(new_pos, pixel_bounds_old.size):
+                    return False
+
+                if self.error_if_texture_dirty():
+                    return False
+
+                copy_texture_region(
+                    self.texture, old_pos, pixel_bounds_old.size, new_pos
+                )
+
+            # Islands that stay in place only need to be pinned
+            if moved:
+                offset = (new_pos - old_pos) / self.texture_size
+                uvs_translate(island.get_faces(), uv_layer, offset)
+
+            uvs_pin(island.get_faces(), uv_layer)
+
+            if moved:
+                island.update_min_max()
+
+            # Append the moved island to all_islands,
+            # so that it is taken into account (as occupied space)
+            # when finding a place for the next island in this loop
+            all_islands.append(island)
+
+        return True
+
+    def find_occupied_islands(
+        self,
+        context,
+        obj,
+        islands: "list[UVIsland]",
+        ignore_unpinned_islands=True,
+        include_other_objects=True,
+    ) -> "list[UVIsland]":
+        """
+        Get the islands that take up space on the texture, from the given
+        islands of obj and (optionally) the islands of other objects
+        that use the same texture.
+        """
+        if include_other_objects:
+            for other in self.all_objects_with_texture(context):
+                if other != obj:  # Exclude this
+                    # print(f"Adding islands from {other}")
+                    islands.extend(get_islands_from_obj(other, False))
+
+        if ignore_unpinned_islands:
+            islands = [isl for isl in islands if isl.any_pinned]
+
+        return islands
+
     def all_objects_with_texture(self, context) -> "list[bpy.types.Object]":
-        objects = []
-        for obj in context.view_layer.objects:
-            if obj.type == "MESH":
-                obj_textures = find_all_textures(obj)
-                if self.texture in obj_textures:
-                    objects.append(obj)
-        return objects
+        # Walking all material node trees isn't free, and the result
+        # doesn't change while the operator runs, so only do it once
+        # (find_texture resets it)
+        if self.objects_with_texture is None:
+            self.objects_with_texture = [
+                obj
+                for obj in context.view_layer.objects
+                if obj.type == "MESH" and object_uses_texture(obj, self.texture)
+            ]
+        return self.objects_with_texture
 
 
 class PIXUNWRAP_OT_create_texture(bpy.types.Operator):
@@ -98,15 +230,12 @@ class PIXUNWRAP_OT_create_texture(bpy.types.Operator):
         )
 
         pixels = PixelArray(None, self.texture_size)
-        new_texture.pixels = pixels.pixels
-    
+        pixels.write_to_image(new_texture)
 
         ##############################
         # SET UV EDITOR TO NEW IMAGE #
         ##############################
-        for area in bpy.context.screen.areas:
-            if area.type == "IMAGE_EDITOR":
-                area.spaces.active.image = new_texture
+        show_image_in_editors(bpy.context.screen, new_texture)
 
         ##########################
         # GET OR CREATE MATERIAL #
@@ -179,9 +308,7 @@ class PIXUNWRAP_OT_duplicate_texture(bpy.types.Operator):
         ##############################
         # SET UV EDITOR TO NEW IMAGE #
         ##############################
-        for area in bpy.context.screen.areas:
-            if area.type == "IMAGE_EDITOR":
-                area.spaces.active.image = new_texture
+        show_image_in_editors(bpy.context.screen, new_texture)
 
         ######################
         # DUPLICATE MATERIAL #
@@ -213,8 +340,16 @@ class PIXUNWRAP_OT_resize_texture(TextureOperator, bpy.types.Operator):
     bl_label = "Resize Texture"
     bl_options = {"UNDO"}
 
+    DownscaleFilters = [
+        ("CROP", "Crop", "Keep the bottom left part of the texture", 1),
+        ("SINC", "Windowed Sinc", "Scale the entire texture down with a smooth filter", 2),
+    ]
+
     scale: bpy.props.FloatProperty(default=2)
     only_update_uvs_on_active: bpy.props.BoolProperty(default=False)
+    downscale_filter: bpy.props.EnumProperty(
+        items=DownscaleFilters, name="Downscale Filter"
+    )
 
     def execute(self, context):
         active_obj = context.view_layer.objects.active
@@ -237,17 +372,23 @@ class PIXUNWRAP_OT_resize_texture(TextureOperator, bpy.types.Operator):
 
         # SCALE UP THE TEXTURE AND PRESERVE THE DATA
         # WHEN SCALING DOWN, TEXTURE IS CROPPED TO BOTTOM LEFT
-        src_pixels = PixelArray(blender_image=self.texture)
-        dst_pixels = PixelArray(size=new_size)
-
-        copy_region_size = Vector2Int(dst_pixels.width, dst_pixels.height)
-        dst_pixels.copy_region(
-            src_pixels, Vector2Int(0, 0), copy_region_size, Vector2Int(0, 0)
-        )
+        # (unless a filter is used, then the entire texture is scaled down)
+        # The whole new texture is filled from the old one (repeated when
+        # scaling up), so there's no need to build a filled PixelArray first.
+        pixels = PixelArray(blender_image=self.texture)
+        filtered = new_size < self.texture_size and self.downscale_filter == "SINC"
+        if filtered:
+            pixels.resample(new_size, new_size)
+        else:
+            pixels.resize(new_size, new_size)
 
         self.texture.scale(new_size, new_size)
-        self.texture.pixels = dst_pixels.pixels
-        self.texture.update()
+        pixels.write_to_image(self.texture)
+
+        if filtered:
+            # The texture content is scaled along with the texture,
+            # so the UVs still cover the same part of it.
+            return {"FINISHED"}
 
         # UPDATE THE UVS TO SPAN THE SAME PIXELS
         # FIND ALL OBJECTS THAT USE THE SAME TEXTURE:
@@ -260,13 +401,24 @@ class PIXUNWRAP_OT_resize_texture(TextureOperator, bpy.types.Operator):
 
         actual_scale_inv = self.texture_size / new_size
 
+        # Objects can share mesh data (linked duplicates),
+        # scaling the same mesh twice would break its UVs
+        updated_meshes = set()
         for obj_to_update in objs_to_update_uvs:
-            bm = get_bmesh(obj_to_update)
-
-            uv_layer = bm.loops.layers.uv.verify()
-            uvs_scale(bm.faces, uv_layer, actual_scale_inv)
-
-            update_and_free_bmesh(obj_to_update, bm)
+            if obj_to_update.data in updated_meshes:
+                continue
+            updated_meshes.add(obj_to_update.data)
+
+            if obj_to_update.data.is_editmode:
+                bm = bmesh.from_edit_mesh(obj_to_update.data)
+                uv_layer = bm.loops.layers.uv.verify()
+                uvs_scale(bm.faces, uv_layer, actual_scale_inv)
+                bmesh.update_edit_mesh(
+                    obj_to_update.data, loop_triangles=False, destructive=False
+                )
+            else:
+                # No need to copy the mesh to a bmesh and back
+                mesh_uvs_scale(obj_to_update.data, actual_scale_inv)
 
         return {"FINISHED"}
     
@@ -430,68 +582,20 @@ class PIXUNWRAP_OT_island_to_free_space(TextureOperator, bpy.types.Operator):
         bm = bmesh.from_edit_mesh(obj.data)
         uv_layer = bm.loops.layers.uv.verify()
 
-        # FIND ISLANDS
-
-        if not self.move_entire_island:
-            selected_faces = [face for face in bm.faces if face.select]
-            other_faces = [face for face in bm.faces if not face.select]
-            selected_islands = get_islands_for_faces(bm, selected_faces, uv_layer)
-            all_islands = get_islands_for_faces(bm, other_faces, uv_layer)
-        else:
-            all_islands = get_islands_from_obj(obj, False)
-            selected_islands = [
-                isl
-                for isl in all_islands
-                if any(uvf.face.select for uvf in isl.uv_faces)
-            ]
-
-        selected_islands = merge_overlapping_islands(selected_islands)
-
-        if self.include_other_objects:
-            for other in self.all_objects_with_texture(context):
-                if other != obj:  # Exclude this
-                    # print(f"Adding islands from {other}")
-                    all_islands.extend(get_islands_from_obj(other, False))
-
-        if self.ignore_unpinned_islands:
-            all_islands = [isl for isl in all_islands if isl.is_any_pinned()]
-
-        modify_texture = self.modify_texture
-
-        for island in selected_islands:
-            pixel_bounds_old = island.calc_pixel_bounds(self.texture_size)
-            old_pos = pixel_bounds_old.min
-
-            new_pos = find_free_space_for_island(
-                island, all_islands, self.texture_size, self.prefer_current_position
-            )
-
-            # Do texture modification first because it could error + cancel the operator
-            if modify_texture:
-                if self.error_if_out_of_bounds(new_pos, pixel_bounds_old.size):
-                    return {"CANCELLED"}
-
-                if self.error_if_texture_dirty():
-                    return {"CANCELLED"}
-
-                copy_texture_region(
-                    self.texture, old_pos, pixel_bounds_old.size, new_pos
-                )
-
-            offset = (new_pos - old_pos) / self.texture_size
-            faces = island.get_faces()
-            uvs_translate_rotate_scale(faces, uv_layer, translate=offset)
-
-            uvs_pin(island.get_faces(), uv_layer)
-
-            island.update_min_max()
-
-            # Append the moved island to all_islands,
-            # so that it is taken into account (as occupied space)
-            # when finding a place for the next island in this loop
-            all_islands.append(island)
+        if not self.selection_to_free_space(
+            context,
+            obj,
+            bm,
+            uv_layer,
+            modify_texture=self.modify_texture,
+            move_entire_island=self.move_entire_island,
+            ignore_unpinned_islands=self.ignore_unpinned_islands,
+            prefer_current_position=self.prefer_current_position,
+            include_other_objects=self.include_other_objects,
+        ):
+            return {"CANCELLED"}
 
-        bmesh.update_edit_mesh(obj.data)
+        bmesh.update_edit_mesh(obj.data, loop_triangles=False, destructive=False)
 
         return {"FINISHED"}
 
@@ -525,9 +629,9 @@ class PIXUNWRAP_OT_repack_uvs(TextureOperator, bpy.types.Operator):
             pixel_bounds = uv_island.calc_pixel_bounds(self.texture_size)
             rect_size = pixel_bounds.size
 
-            locked = uv_island.is_any_orientation_locked()
             # Flip all rectangles to lay flat (wider than they are high)
-            if not locked and rect_size.y > rect_size.x:
+            # Only check for locked faces if the island would be flipped
+            if rect_size.y > rect_size.x and not uv_island.is_any_orientation_locked():
                 rect_size = Vector2Int(rect_size.y, rect_size.x)
                 need_flip.append(True)
             else:
@@ -541,8 +645,18 @@ class PIXUNWRAP_OT_repack_uvs(TextureOperator, bpy.types.Operator):
         min_size = self.texture_size // 2 if (self.texture_size % 2 == 0) else self.texture_size
         new_positions, needed_size = pack_rects(sizes, min_size)
 
+        new_positions = [Vector2Int(x, y) for x, y in new_positions]
+
         modify_texture = self.modify_texture and self.texture is not None
 
+        # If every island stays where it is, there's nothing to copy around
+        # in the texture (common when repacking an already packed atlas)
+        if needed_size == self.texture_size and not any(
+            flip or new_pos != old_rect.min
+            for new_pos, old_rect, flip in zip(new_positions, old_rects, need_flip)
+        ):
+            modify_texture = False
+
         if modify_texture:
             if self.error_if_out_of_bounds(Vector2Int(0,0), Vector2Int(needed_size, 1)):
                 return {"CANCELLED"}
@@ -556,8 +670,6 @@ class PIXUNWRAP_OT_repack_uvs(TextureOperator, bpy.types.Operator):
         for new_pos, old_rect, island, flip in zip(
             new_positions, old_rects, islands, need_flip
         ):
-            new_pos = Vector2Int(new_pos[0], new_pos[1])
-
             old_pos = old_rect.min
             # print(f"ISLAND\n{old_pos=} {texture_size=} {new_pos=} {new_size=}\n")
             offset = new_pos - old_pos
@@ -566,8 +678,6 @@ class PIXUNWRAP_OT_repack_uvs(TextureOperator, bpy.types.Operator):
             matrix[0][2] = offset.x
             matrix[1][2] = offset.y
 
-            faces = [faceinfo.face for faceinfo in island.uv_faces]
-
             # Should the rectangular UV island be flipped?
             # We do this in a way that preserves the bottom left point
             # so that translation below can happen as usual,
@@ -576,22 +686,22 @@ class PIXUNWRAP_OT_repack_uvs(TextureOperator, bpy.types.Operator):
             if flip:
                 h = old_rect.size.y / 2
                 pivot = Vector((old_pos.x + h, old_pos.y + h))
-                flip_matrix = Matrix.Rotation(radians(90), 2).to_3x3()
+                flip_matrix = ROTATE_90.copy()
                 matrix_pin_pivot(flip_matrix, pivot)
                 matrix = matrix @ flip_matrix
 
-            matrix_uv = get_uv_space_matrix(matrix, self.texture_size)
-
-            uvs_transform(faces, uv_layer, matrix_uv)
+            # Islands that keep their place don't need their UVs rewritten
+            if flip or offset != Vector2Int(0, 0):
+                matrix_uv = get_uv_space_matrix(matrix, self.texture_size)
+                uvs_transform(island.get_faces(), uv_layer, matrix_uv)
 
             if modify_texture:
                 dst_pixels.copy_region_transformed(src_pixels, old_rect, matrix)
 
-        bmesh.update_edit_mesh(obj.data)
+        bmesh.update_edit_mesh(obj.data, loop_triangles=False, destructive=False)
 
         if modify_texture:
-            self.texture.pixels = dst_pixels.pixels
-            self.texture.update()
+            dst_pixels.write_to_image(self.texture)
 
         # texture.save()
         return {"FINISHED"}
@@ -616,12 +726,12 @@ class PIXUNWRAP_OT_set_uv_texel_density(TextureOperator, bpy.types.Operator):
         bm = bmesh.from_edit_mesh(obj.data)
         uv_layer = bm.loops.layers.uv.verify()
 
-        faces = [face for face in bm.faces if face.select]
+        faces = get_selected_faces(bm)
 
         (current_density, scale) = uvs_scale_texel_density(bm, faces, uv_layer, self.texture_size, target_density)
         self.report({'INFO'}, f"Current: {current_density:.1f} PPU. Target: {target_density:.1f} PPU. Scale: {scale:.4f}")
 
-        bmesh.update_edit_mesh(obj.data)
+        bmesh.update_edit_mesh(obj.data, loop_triangles=False, destructive=False)
 
         return {"FINISHED"}
 
@@ -645,27 +755,39 @@ class PIXUNWRAP_OT_unwrap_pixel_grid(TextureOperator, bpy.types.Operator):
         bm = bmesh.from_edit_mesh(obj.data)
         uv_layer = bm.loops.layers.uv.verify()
 
-        all_target_faces = [face for face in bm.faces if face.select]
+        all_target_faces = get_selected_faces(bm)
 
-        for quad_group, connected_non_quads in zip(*find_quad_groups(all_target_faces)):
-            # print(
-            #     f"UNWRAPPING QUAD ISLAND with {len(quad_group)} quads and {len(connected_non_quads)} attached non-quads"
-            # )
+        # Find the occupied space once, from everything except the faces
+        # that are being unwrapped. Each group is added to it once it's placed.
+        _, other_islands = get_islands_by_selection(bm, uv_layer)
+        occupied_islands = self.find_occupied_islands(context, obj, other_islands)
 
-            for face in all_target_faces:
-                face.select = False
+        groups = list(zip(*find_quad_groups(all_target_faces)))
 
+        # Unwrap the quads of all groups in one go. Quad groups don't share
+        # any (non-seam) edges, so they end up as separate islands anyway.
+        # This is only a starting point for straightening the grids.
+        for face in all_target_faces:
+            face.select = False
+        for quad_group, _ in groups:
             for face in quad_group:
                 face.select = True
 
-            bpy.ops.uv.unwrap(
-                method="ANGLE_BASED",
-                fill_holes=True,
-                correct_aspect=True,
-                use_subsurf_data=False,
-                margin=0.01,
-            )
+        bpy.ops.uv.unwrap(
+            method="ANGLE_BASED",
+            fill_holes=True,
+            correct_aspect=True,
+            use_subsurf_data=False,
+            margin=0.01,
+        )
+
+        for face in all_target_faces:
+            face.select = False
 
+        for quad_group, connected_non_quads in groups:
+            # print(
+            #     f"UNWRAPPING QUAD ISLAND with {len(quad_group)} quads and {len(connected_non_quads)} attached non-quads"
+            # )
             try:
                 grid = Grid(bm, quad_group)
             except GridBuildException as e:
@@ -678,7 +800,26 @@ class PIXUNWRAP_OT_unwrap_pixel_grid(TextureOperator, bpy.types.Operator):
             uvs_pin(quad_group, uv_layer)
             uvs_pin(connected_non_quads, uv_layer, False)
 
-            for face in connected_non_quads:
+        # Every grid is straightened at the UV origin. Groups whose faces
+        # connect to another group (e.g. through a triangle fan between two
+        # quad strips) would become one island with overlapping pins, those
+        # are unwrapped one group at a time. All other groups in one go.
+        group_faces = [quad_group + non_quads for quad_group, non_quads in groups]
+        linked = find_linked_groups(group_faces)
+        unwrap_batches = [
+            [
+                face
+                for i, faces in enumerate(group_faces)
+                if i not in linked
+                for face in faces
+            ]
+        ]
+        unwrap_batches.extend(group_faces[i] for i in sorted(linked))
+
+        for batch in unwrap_batches:
+            if not batch:
+                continue
+            for face in batch:
                 face.select = True
 
             bpy.ops.uv.unwrap(
@@ -688,18 +829,34 @@ class PIXUNWRAP_OT_unwrap_pixel_grid(TextureOperator, bpy.types.Operator):
                 use_subsurf_data=False,
                 margin=0.01,
             )
+
+            for face in batch:
+                face.select = False
+
+        for quad_group, connected_non_quads in groups:
             # uvs_snap_to_texel_corner(
             #     non_quad_group, uv_layer, texture_size, skip_pinned=True
             # )
             uvs_pin(connected_non_quads, uv_layer)
 
-            bpy.ops.view3d.pixunwrap_island_to_free_space(modify_texture=False)
+        # Move the groups to free space one at a time, so only select one
+        # group, and deselect it again when it's done
+        for faces in group_faces:
+            for face in faces:
+                face.select = True
+
+            self.selection_to_free_space(
+                context, obj, bm, uv_layer, occupied_islands=occupied_islands
+            )
+
+            for face in faces:
+                face.select = False
 
         # Wrap things up: Reselect all faces (because we messed with selections)
         for face in all_target_faces:
             face.select = True
 
-        bmesh.update_edit_mesh(obj.data)
+        bmesh.update_edit_mesh(obj.data, loop_triangles=False, destructive=False)
 
         return {"FINISHED"}
 
@@ -726,14 +883,14 @@ class PIXUNWRAP_OT_unwrap_extend(TextureOperator, bpy.types.Operator):
             margin=0.01,
         )
 
-        selected_faces = list(face for face in bm.faces if face.select)
+        selected_faces = get_selected_faces(bm)
 
         uvs_snap_to_texel_corner(
             selected_faces, uv_layer, self.texture_size, skip_pinned=True
         )
         uvs_pin(selected_faces, uv_layer)
 
-        bmesh.update_edit_mesh(obj.data)
+        bmesh.update_edit_mesh(obj.data, loop_triangles=False, destructive=False)
 
         return {"FINISHED"}
 
@@ -755,7 +912,7 @@ class PIXUNWRAP_OT_unwrap_basic(TextureOperator, bpy.types.Operator):
         bm = bmesh.from_edit_mesh(obj.data)
         uv_layer = bm.loops.layers.uv.verify()
 
-        selected_faces = list(face for face in bm.faces if face.select)
+        selected_faces = get_selected_faces(bm)
         uvs_pin(selected_faces, uv_layer, False)
 
         bpy.ops.uv.unwrap(
@@ -783,13 +940,13 @@ class PIXUNWRAP_OT_unwrap_basic(TextureOperator, bpy.types.Operator):
         island = UVIsland(selected_faces, bm, uv_layer)
         center = 0.5 * (island.max + island.min)
         offset = rounded_size / 2 - center
-        uvs_translate_rotate_scale(selected_faces, uv_layer, offset)
+        uvs_translate(selected_faces, uv_layer, offset)
 
-        bpy.ops.view3d.pixunwrap_island_to_free_space(modify_texture=False)
+        self.selection_to_free_space(context, obj, bm, uv_layer)
 
         uvs_pin(selected_faces, uv_layer)
 
-        bmesh.update_edit_mesh(obj.data)
+        bmesh.update_edit_mesh(obj.data, loop_triangles=False, destructive=False)
 
         return {"FINISHED"}
 
@@ -811,7 +968,7 @@ class PIXUNWRAP_OT_unwrap_single_pixel(TextureOperator, bpy.types.Operator):
         bm = bmesh.from_edit_mesh(obj.data)
         uv_layer = bm.loops.layers.uv.verify()
 
-        selected_faces = list(face for face in bm.faces if face.select)
+        selected_faces = get_selected_faces(bm)
         uvs_pin(selected_faces, uv_layer, False)
 
         bpy.ops.uv.unwrap(
@@ -828,7 +985,6 @@ class PIXUNWRAP_OT_unwrap_single_pixel(TextureOperator, bpy.types.Operator):
             # a = pi * 2 * v / v_total
             
             f = floor(v * 4 / v_total) / 4.0
-            print(f)
             # Start at 45 degrees
             a = pi * 2 * (f + .125)
 
@@ -838,17 +994,24 @@ class PIXUNWRAP_OT_unwrap_single_pixel(TextureOperator, bpy.types.Operator):
             radius = sqrt(.49)
             return Vector((radius * cos(a) + 0.5, radius * sin(a) + 0.5))
 
+        # The positions only depend on the vertex count of the face,
+        # so compute them once for each vertex count
+        pos_tables = {}
         for face in selected_faces:
             v_count = len(face.loops)
-            for v, loop in enumerate(face.loops):
-                p = vert_pos(v, v_count) * target_size
+            pos_table = pos_tables.get(v_count)
+            if pos_table is None:
+                pos_table = pos_tables[v_count] = [
+                    vert_pos(v, v_count) * target_size for v in range(v_count)
+                ]
+            for loop, p in zip(face.loops, pos_table):
                 loop[uv_layer].uv = p
 
         uvs_pin(selected_faces, uv_layer, True)
 
-        bmesh.update_edit_mesh(obj.data)
+        self.selection_to_free_space(context, obj, bm, uv_layer)
 
-        bpy.ops.view3d.pixunwrap_island_to_free_space(modify_texture=False)
+        bmesh.update_edit_mesh(obj.data, loop_triangles=False, destructive=False)
 
         return {"FINISHED"}
 
@@ -869,7 +1032,7 @@ class PIXUNWRAP_OT_uv_grid_fold(bpy.types.Operator):
         bm = bmesh.from_edit_mesh(obj.data)
         uv_layer = bm.loops.layers.uv.verify()
 
-        all_target_faces = [face for face in bm.faces if face.select]
+        all_target_faces = get_selected_faces(bm)
 
         for quad_group, _ in zip(*find_quad_groups(all_target_faces)):
             try:
@@ -880,7 +1043,7 @@ class PIXUNWRAP_OT_uv_grid_fold(bpy.types.Operator):
                 self.report({"ERROR"}, str(e))
                 return {"CANCELLED"}
 
-        bmesh.update_edit_mesh(obj.data)
+        bmesh.update_edit_mesh(obj.data, loop_triangles=False, destructive=False)
         return {"FINISHED"}
 
 
@@ -909,7 +1072,7 @@ class PIXUNWRAP_OT_uv_flip(TextureOperator, bpy.types.Operator):
         islands = get_islands_from_obj(obj, True)
         islands = merge_overlapping_islands(islands)
 
-        texture = find_texture(obj)
+        texture = self.texture
 
         for island in islands:
             island_rect = island.calc_pixel_bounds(self.texture_size)
@@ -917,10 +1080,10 @@ class PIXUNWRAP_OT_uv_flip(TextureOperator, bpy.types.Operator):
             # `matrix` is the matrix used for transforming texture pixels,
             # `matrix_uv` is the matrix used for transforming uv coords
             if self.flip_axis == "X":
-                matrix = Matrix.Diagonal((-1, 1, 1))
+                matrix = FLIP_X.copy()
                 pivot = (island_rect.min + island_rect.max) / 2
             elif self.flip_axis == "Y":
-                matrix = Matrix.Diagonal((1, -1, 1))
+                matrix = FLIP_Y.copy()
                 pivot = (island_rect.min + island_rect.max) / 2
 
             matrix_pin_pivot(matrix, pivot)
@@ -932,7 +1095,7 @@ class PIXUNWRAP_OT_uv_flip(TextureOperator, bpy.types.Operator):
             if self.modify_texture:
                 copy_texture_region_transformed(texture, island_rect, matrix)
 
-        bmesh.update_edit_mesh(obj.data)
+        bmesh.update_edit_mesh(obj.data, loop_triangles=False, destructive=False)
         return {"FINISHED"}
 
 
@@ -960,36 +1123,57 @@ class PIXUNWRAP_OT_uv_rot_90(TextureOperator, bpy.types.Operator):
         islands = get_islands_from_obj(obj, True)
         islands = merge_overlapping_islands(islands)
 
-        texture = find_texture(obj)
+        # Space taken by the unselected islands, and the original space of
+        # all selected islands (so a rotated island can't be placed over the
+        # pixels of an island that hasn't been rotated yet).
+        # The rotated islands are added to it as they are placed.
+        _, other_islands = get_islands_by_selection(bm, uv_layer)
+        occupied_islands = self.find_occupied_islands(context, obj, other_islands)
+        occupied_rects = [
+            isl.calc_pixel_bounds(self.texture_size) for isl in occupied_islands
+        ]
+        island_rects = [island.calc_pixel_bounds(self.texture_size) for island in islands]
+        occupied_rects.extend(island_rects)
 
-        for island in islands:
-            island_rect = island.calc_pixel_bounds(self.texture_size)
+        texture = self.texture
+
+        for island, island_rect in zip(islands, island_rects):
 
-            matrix = Matrix.Rotation(radians(90), 2).to_3x3()
+            matrix = ROTATE_90.copy()
             h = island_rect.size.y / 2
             pivot = Vector((island_rect.min.x + h, island_rect.min.y + h))
 
             matrix_pin_pivot(matrix, pivot)
 
-            matrix_uv = get_uv_space_matrix(matrix, self.texture_size)
-            uvs_transform(island.get_faces(), uv_layer, matrix_uv)
-
             # When rotating, the bounds change, so we need to find some
             # FREE SPACE on the texture to move the island to.
-            # We do this AFTER already having rotated the UV's, so
-            # free space is found for the rotated island.
-            # but we do the TEXTURE modification afterwards, for the
-            # entire transformation in one (rotate + move to free space)
+            # Rotating around this pivot keeps the bottom left corner
+            # in place and swaps width and height, so free space can be
+            # found for the rotated rect before touching the UVs.
+            # Then the UVs (and texture) get the entire transformation
+            # in one go (rotate + move to free space)
             old_pos = island_rect.min
-            bpy.ops.view3d.pixunwrap_island_to_free_space(modify_texture=False)
-            island.update_min_max()
-            new_rect = island.calc_pixel_bounds(self.texture_size)
-            new_pos = new_rect.min
+            new_size = Vector2Int(island_rect.size.y, island_rect.size.x)
+            # Only the island's own original rect doesn't count as occupied
+            new_pos = find_free_space_for_rect(
+                RectInt(old_pos, old_pos + new_size),
+                [rect for rect in occupied_rects if rect is not island_rect],
+                self.texture_size,
+                False,
+            )
+            new_rect = RectInt(new_pos, new_pos + new_size)
 
             offset = new_pos - old_pos
             matrix[0][2] += offset.x
             matrix[1][2] += offset.y
 
+            matrix_uv = get_uv_space_matrix(matrix, self.texture_size)
+            uvs_transform(island.get_faces(), uv_layer, matrix_uv)
+            uvs_pin(island.get_faces(), uv_layer)
+
+            island.update_min_max()
+            occupied_rects.append(island.calc_pixel_bounds(self.texture_size))
+
             if self.modify_texture and texture is not None:
                 if not texture_rect.contains(new_rect.min, new_rect.size):
                     self.report(
@@ -1002,7 +1186,7 @@ class PIXUNWRAP_OT_uv_rot_90(TextureOperator, bpy.types.Operator):
                 copy_texture_region_transformed(texture, island_rect, matrix)
 
         # THIS INVALIDATES ALL FACE DATA, SO DO IT OUTSIDE OF MAIN LOOP
-        lock_orientation(bm, [face.index for face in bm.faces if face.select], True)
+        lock_orientation(bm, [face.index for face in get_selected_faces(bm)], True)
 
         bmesh.update_edit_mesh(obj.data)
         return {"FINISHED"}
@@ -1036,10 +1220,9 @@ class PIXUNWRAP_OT_stack_islands(TextureOperator, bpy.types.Operator):
                 tx = (x - other_island_rect.min.x) / self.texture_size
                 ty = (y - other_island_rect.min.y) / self.texture_size
             
-                matrix_uv = Matrix.Translation(Vector((tx,ty,0)))
-                uvs_transform(other_island.get_faces(), uv_layer, matrix_uv)
+                uvs_translate(other_island.get_faces(), uv_layer, Vector((tx, ty)))
 
-        bmesh.update_edit_mesh(obj.data)
+        bmesh.update_edit_mesh(obj.data, loop_triangles=False, destructive=False)
         return {"FINISHED"}
     
 class PIXUNWRAP_OT_nudge_islands(TextureOperator, bpy.types.Operator):
@@ -1069,10 +1252,9 @@ class PIXUNWRAP_OT_nudge_islands(TextureOperator, bpy.types.Operator):
             tx = self.move_x / self.texture_size
             ty = self.move_y / self.texture_size
             
-            matrix_uv = Matrix.Translation(Vector((tx,ty,0)))
-            uvs_transform(island.get_faces(), uv_layer, matrix_uv)
+            uvs_translate(island.get_faces(), uv_layer, Vector((tx, ty)))
 
-        bmesh.update_edit_mesh(obj.data)
+        bmesh.update_edit_mesh(obj.data, loop_triangles=False, destructive=False)
         return {"FINISHED"}
 
 
@@ -1087,6 +1269,30 @@ class PIXUNWRAP_OT_randomize_islands(TextureOperator, bpy.types.Operator):
     x_max: bpy.props.FloatProperty(name="X Max", default=1, min=0, max=1)
     y_min: bpy.props.FloatProperty(name="Y Min", default=0, min=0, max=1)
     y_max: bpy.props.FloatProperty(name="Y Max", default=1, min=0, max=1)
+    seed: bpy.props.IntProperty(
+        name="Seed",
+        default=0,
+        min=0,
+        description="Seed for reproducible positions, 0 picks new positions every time",
+    )
+
+    RandomizeModes = [
+        ("RANDOM", "Random", "Move each island to a random position", 1),
+        (
+            "SHELF",
+            "Shelf",
+            "Place the islands in rows without overlap, islands that don't fit are placed randomly",
+            2,
+        ),
+        (
+            "PACK",
+            "Pack Tight",
+            "Pack the islands as tightly as possible, falls back to Shelf if they don't all fit",
+            3,
+        ),
+    ]
+
+    mode: bpy.props.EnumProperty(items=RandomizeModes, name="Mode")
 
     def execute(self, context):
         bpy.ops.ed.undo_push()
@@ -1097,9 +1303,9 @@ class PIXUNWRAP_OT_randomize_islands(TextureOperator, bpy.types.Operator):
         bm = bmesh.from_edit_mesh(obj.data)
         uv_layer = bm.loops.layers.uv.verify()
 
-        
-        min_x = floor(self.texture_size * self.x_min)
-        min_y = floor(self.texture_size * self.y_min)
+        # x_min and y_min can't be negative, so int() rounds down
+        min_x = int(self.texture_size * self.x_min)
+        min_y = int(self.texture_size * self.y_min)
 
         # ensure no negative coords
         max_x_bound = ceil(self.texture_size * self.x_max)
@@ -1107,21 +1313,50 @@ class PIXUNWRAP_OT_randomize_islands(TextureOperator, bpy.types.Operator):
 
         # FIND ISLANDS
         islands = get_islands_from_obj(obj, True)
+        island_rects = [
+            island.calc_pixel_bounds(self.texture_size) for island in islands
+        ]
+
+        if islands:
+            # Pick the new positions of all islands at once (inclusive range)
+            sizes = np.array([(r.size.x, r.size.y) for r in island_rects])
+            # Islands bigger than the range are placed at the min
+            max_xy = np.maximum((min_x, min_y), (max_x_bound, max_y_bound) - sizes)
+            # Same seed (and islands) gives the same positions,
+            # seed 0 (the default) draws new positions every time
+            random_state = np.random.RandomState(self.seed or None)
+            new_positions = random_state.randint((min_x, min_y), max_xy + 1).tolist()
+
+            packed_positions = None
+            if self.mode == "PACK":
+                packed_positions = pack_rects_maxrects(
+                    sizes.tolist(), max_x_bound - min_x, max_y_bound - min_y
+                )
 
-        for island in islands:
-            island_rect = island.calc_pixel_bounds(self.texture_size)
-
-            max_x = max(min_x, max_x_bound - island_rect.size.x)
-            max_y = max(min_y, max_y_bound - island_rect.size.y)
-
-            tx = (random.randint(min_x, max_x) - island_rect.min.x) / self.texture_size
-            ty = (random.randint(min_y, max_y) - island_rect.min.y) / self.texture_size
+            if packed_positions is not None:
+                new_positions = [(x + min_x, y + min_y) for x, y in packed_positions]
+            elif self.mode in ("SHELF", "PACK"):
+                shelf_positions = pack_rects_shelf(
+                    sizes.tolist(), (min_x, min_y), (max_x_bound, max_y_bound)
+                )
+                new_positions = [
+                    shelf_pos if shelf_pos is not None else random_pos
+                    for shelf_pos, random_pos in zip(shelf_positions, new_positions)
+                ]
+        else:
+            new_positions = []
 
-            matrix_uv = Matrix.Translation(Vector((tx, ty, 0)))
+        inv_texture_size = 1.0 / self.texture_size
+        for island, island_rect, (x, y) in zip(islands, island_rects, new_positions):
+            rect_min = island_rect.min
+            if x == rect_min.x and y == rect_min.y:
+                continue
+            tx = (x - rect_min.x) * inv_texture_size
+            ty = (y - rect_min.y) * inv_texture_size
 
-            uvs_transform(island.get_faces(), uv_layer, matrix_uv)
+            uvs_translate(island.get_faces(), uv_layer, Vector((tx, ty)))
 
-        bmesh.update_edit_mesh(obj.data)
+        bmesh.update_edit_mesh(obj.data, loop_triangles=False, destructive=False)
         return {"FINISHED"}
 
 
@@ -1134,17 +1369,15 @@ class PIXUNWRAP_OT_object_info(bpy.types.Operator):
 
     def execute(self, context):
         active_obj = context.view_layer.objects.active
-        textures = find_all_textures(active_obj)
-        textures = list(set(textures))
+        textures = set(find_all_textures(active_obj))
 
+        # Look up the textures of each object once, instead of once per texture
         objects_sharing_texture = []
-        for tex in textures:
-            for obj in context.view_layer.objects:
-                if obj.type == "MESH":
-                    obj_textures = find_all_textures(obj)
-                    if tex in obj_textures:
-                        objects_sharing_texture.append(obj)
-            
+        for obj in context.view_layer.objects:
+            if obj.type == "MESH":
+                if not textures.isdisjoint(find_all_textures(obj)):
+                    objects_sharing_texture.append(obj)
+
         tex_names = ", ".join(tex.name for tex in textures)
         obj_names = ", ".join(ob.name for ob in objects_sharing_texture)
         self.report({"INFO"}, f"Used textures: [{tex_names}] Other objects: [{obj_names}]")
@@ -1,5 +1,4 @@
-from dataclasses import dataclass
-
+import numpy as np
 
 from .common import (
     RectInt,
@@ -10,69 +9,175 @@ from .islands import (
 )
 
 
-@dataclass
-class BoxPackingStrip:
-    y: int
-    height: int
-    filled: int
+def pack_rects(rect_sizes, initial_space_size=16):
+    """
+    rect_sizes is a list of rectangles with integer sizes
 
-    def fits_rect(self, rect, space_size):
-        """
-        What is a Level?
-        (y, height, filled_width)
-        Something fits if rect.h <= height AND rect.w <= space_size - filled_width
-        """
-        return rect[1] <= self.height and rect[0] < space_size - self.filled
+    Packs the rectangles into a square space using MAXRECTS (see
+    pack_rects_maxrects). Starts at initial_space_size and doubles the
+    space until all rectangles fit.
+    Returns the positions (in the same order as rect_sizes) and the size
+    of the space that was needed.
+    """
+    space_size = initial_space_size
+    while True:
+        output_positions = pack_rects_maxrects(rect_sizes, space_size)
+        if output_positions is not None:
+            return output_positions, space_size
+        space_size *= 2
 
 
-def pack_rects(rect_sizes, initial_space_size=16):
+def pack_rects_maxrects(rect_sizes, space_size, space_height=None):
     """
-    rect_sizes is a list of rectangles with integer sizes
+    MAXRECTS with the Best Short Side Fit heuristic, from
+    "A Thousand Ways to Pack the Bin" (Jukka Jylänki).
+
+    Keeps a list of maximal free rectangles (that may overlap). Each rect
+    (largest side first) is placed in the free rectangle where it leaves
+    the smallest leftover on its shortest side. Every free rectangle that
+    intersects the placed rect is then split, and free rectangles that are
+    contained in another one are pruned.
 
-    FFDH packs the next item R (in non-increasing height) on the first level where R fits. If no level can accommodate R, a new level is created.
-    Time complexity of FFDH: O(n·log n).
-    Approximation ratio: FFDH(I)<=(17/10)·OPT(I)+1; the asymptotic bound of 17/10 is tight.
+    The space is square, unless a different space_height is given.
+    Returns a list of (x, y) positions in the same order as rect_sizes,
+    or None if the rects don't all fit in a space of the given size.
     """
+    if space_height is None:
+        space_height = space_size
+    # Free rectangles as (x, y, width, height)
+    free_rects = [(0, 0, space_size, space_height)]
+    output_positions = [None] * len(rect_sizes)
 
-    # Prefix indices so that we can refer to those later
-    rects = enumerate(rect_sizes)
-    # Sort the rectangles by height
-    rects = sorted(rects, key=lambda p: p[1][1], reverse=True)
+    order = sorted(
+        range(len(rect_sizes)),
+        key=lambda i: (max(rect_sizes[i]), min(rect_sizes[i])),
+        reverse=True,
+    )
 
-    output_positions = []
-    levels = []
-    space_size = initial_space_size
+    for idx in order:
+        w, h = rect_sizes[idx]
+
+        # Score is (short side leftover, long side leftover, y, x)
+        # the position is used to prefer the bottom left on a tie.
+        best_score = None
+        for fx, fy, fw, fh in free_rects:
+            if w <= fw and h <= fh:
+                leftover_x = fw - w
+                leftover_y = fh - h
+                score = (
+                    min(leftover_x, leftover_y),
+                    max(leftover_x, leftover_y),
+                    fy,
+                    fx,
+                )
+                if best_score is None or score < best_score:
+                    best_score = score
+
+        if best_score is None:
+            return None
+
+        x, y = best_score[3], best_score[2]
+        output_positions[idx] = (x, y)
+        free_rects = split_free_rects(free_rects, x, y, w, h)
+
+    return output_positions
+
+
+def split_free_rects(free_rects, x, y, w, h):
+    """
+    Remove the area (x, y, w, h) from the list of maximal free rectangles,
+    any free rectangle that overlaps it is split into (up to 4) maximal
+    rectangles around it.
+    """
+    x_max = x + w
+    y_max = y + h
+    new_free_rects = []
+    for free in free_rects:
+        fx, fy, fw, fh = free
+        fx_max = fx + fw
+        fy_max = fy + fh
+        if x >= fx_max or x_max <= fx or y >= fy_max or y_max <= fy:
+            new_free_rects.append(free)
+            continue
+
+        if x > fx:  # Left part
+            new_free_rects.append((fx, fy, x - fx, fh))
+        if x_max < fx_max:  # Right part
+            new_free_rects.append((x_max, fy, fx_max - x_max, fh))
+        if y > fy:  # Bottom part
+            new_free_rects.append((fx, fy, fw, y - fy))
+        if y_max < fy_max:  # Top part
+            new_free_rects.append((fx, y_max, fw, fy_max - y_max))
+
+    # Prune free rectangles that are fully contained in another one
+    pruned = []
+    for i, (ax, ay, aw, ah) in enumerate(new_free_rects):
+        contained = False
+        for j, (bx, by, bw, bh) in enumerate(new_free_rects):
+            if (
+                i != j
+                and ax >= bx
+                and ay >= by
+                and ax + aw <= bx + bw
+                and ay + ah <= by + bh
+                # Of two identical rects, keep the first one
+                and ((aw, ah, ax, ay) != (bw, bh, bx, by) or j < i)
+            ):
+                contained = True
+                break
+        if not contained:
+            pruned.append((ax, ay, aw, ah))
+
+    return pruned
+
+
+def pack_rects_shelf(rect_sizes, space_min, space_max):
+    """
+    Shelf packing: rects are placed (tallest first) in rows from the bottom
+    of the space up, each row is as tall as the tallest rect in it.
+    Rows alternate between filling left to right and right to left,
+    so the short rects at the end of a row sit next to the tall ones
+    at the start of the next row.
 
-    while len(output_positions) < len(rects):
-        # This starts a new iteration at a larger size
-        output_positions = []
-        levels = []
-        for idx, rect in rects:
-            level_where_fits = next(
-                filter(lambda level: level.fits_rect(rect, space_size), levels), None
-            )
+    Returns a list of (x, y) positions in the same order as rect_sizes,
+    with None for the rects that didn't fit in the space.
+    """
+    min_x, min_y = space_min
+    max_x, max_y = space_max
+    output_positions = [None] * len(rect_sizes)
+
+    # sorted() is stable, so rects of the same height keep their order
+    order = sorted(range(len(rect_sizes)), key=lambda i: -rect_sizes[i][1])
 
-            if level_where_fits is None:
-                y = 0 if not levels else (levels[-1].y + levels[-1].height)
-                height = rect[1]
+    row_y = min_y
+    row_height = 0
+    row_width = 0
+    left_to_right = True
+    for idx in order:
+        w, h = rect_sizes[idx]
+        if w > max_x - min_x:
+            # Doesn't fit in any row, skip it without closing the current row
+            continue
 
-                # If we ran out of space, increase the space size and start over
-                # output_positions will not be filled, so the while loop runs again
-                if (y + height) > space_size:
-                    space_size *= 2
-                    break
+        if min_x + row_width + w > max_x:
+            # Start a new row
+            row_y += row_height
+            row_height = 0
+            row_width = 0
+            left_to_right = not left_to_right
 
-                level_where_fits = BoxPackingStrip(y, height, -1)
-                levels.append(level_where_fits)
+        if row_y + h > max_y:
+            continue
 
-            # Add the rect to the level:
-            output_positions.append(
-                (idx, (level_where_fits.filled + 1, level_where_fits.y))
-            )
-            level_where_fits.filled += rect[0]
+        if left_to_right:
+            x = min_x + row_width
+        else:
+            x = max_x - row_width - w
+        output_positions[idx] = (x, row_y)
+        row_width += w
+        row_height = max(row_height, h)
 
-    output_positions = [pos for (idx, pos) in sorted(output_positions)]
-    return output_positions, space_size
+    return output_positions
 
 
 def find_free_space_for_island(
@@ -81,21 +186,36 @@ def find_free_space_for_island(
     texture_size: int,
     prefer_current_position: bool
 ):
-
-    candidate_positions = [Vector2Int(0, 0)]
     current_rect = target_island.calc_pixel_bounds(texture_size)
+    rects = [
+        uv_island.calc_pixel_bounds(texture_size)
+        for uv_island in all_islands
+        if uv_island != target_island
+    ]
+    return find_free_space_for_rect(
+        current_rect, rects, texture_size, prefer_current_position
+    )
+
 
-    rects = []
-    for uv_island in all_islands:
-        if uv_island != target_island:
-            island_rect = uv_island.calc_pixel_bounds(texture_size)
-            rects.append(island_rect)
-            candidate_positions.append(
-                Vector2Int(island_rect.max.x, island_rect.min.y)
-            )
-            candidate_positions.append(
-                Vector2Int(island_rect.min.x, island_rect.max.y)
-            )
+def find_free_space_for_rect(
+    current_rect: RectInt,
+    rects: "list[RectInt]",
+    texture_size: int,
+    prefer_current_position: bool
+):
+    """
+    Find a position for current_rect where it doesn't overlap any of the
+    (occupied) rects. Useful when the rect isn't the current bounds of an
+    island yet, for example the bounds an island will have after rotating.
+    """
+    candidate_positions = [Vector2Int(0, 0)]
+    for island_rect in rects:
+        candidate_positions.append(
+            Vector2Int(island_rect.max.x, island_rect.min.y)
+        )
+        candidate_positions.append(
+            Vector2Int(island_rect.min.x, island_rect.max.y)
+        )
 
     candidate_positions.sort(key=lambda p: (p.y, p.x))
 
@@ -110,10 +230,11 @@ def find_free_space_for_island(
     tex_rect = RectInt(tex_min, tex_max)
 
     size = current_rect.size
-    for p in candidate_positions:
-        if tex_rect.contains(p, size):
-            if not any(r.overlaps(p, size) for r in rects):
-                return p
+    inside_positions = [p for p in candidate_positions if tex_rect.contains(p, size)]
+    inside_free = positions_free(rects, inside_positions, size)
+    for p, free in zip(inside_positions, inside_free):
+        if free:
+            return p
 
     # Fallback: Disregard texture size and put the island
     # outside the texture bounds if necessary
@@ -123,3 +244,49 @@ def find_free_space_for_island(
 
     # fallback:
     return Vector2Int(0, 0)
+
+
+def positions_free(
+    rects: "list[RectInt]", positions: "list[Vector2Int]", size: Vector2Int
+):
+    """
+    Check for each position if a rect of the given size placed there
+    would not overlap any of the rects. Returns a list of booleans.
+
+    Checks all positions at once using an occupancy grid and a summed
+    area table. The grid only has a row/column for each distinct
+    coordinate of the rect edges and the positions (instead of one per
+    pixel), so its size doesn't depend on the texture size.
+    """
+    if not positions:
+        return []
+    if not rects:
+        return [True] * len(positions)
+
+    rect_coords = np.array([(r.min.x, r.min.y, r.max.x, r.max.y) for r in rects])
+    pos = np.array([(p.x, p.y) for p in positions])
+    pos_max = pos + (size.x, size.y)
+
+    xs = np.unique(
+        np.concatenate((rect_coords[:, 0], rect_coords[:, 2], pos[:, 0], pos_max[:, 0]))
+    )
+    ys = np.unique(
+        np.concatenate((rect_coords[:, 1], rect_coords[:, 3], pos[:, 1], pos_max[:, 1]))
+    )
+
+    # Cell (i, j) of the grid spans from ys[i] to ys[i+1] and xs[j] to xs[j+1]
+    occupied = np.zeros((len(ys), len(xs)), dtype=np.int32)
+    rect_x = np.searchsorted(xs, rect_coords[:, 0::2])
+    rect_y = np.searchsorted(ys, rect_coords[:, 1::2])
+    for (x0, x1), (y0, y1) in zip(rect_x, rect_y):
+        occupied[y0:y1, x0:x1] = 1
+
+    table = np.zeros((len(ys) + 1, len(xs) + 1), dtype=np.int32)
+    table[1:, 1:] = occupied.cumsum(axis=0).cumsum(axis=1)
+
+    x0 = np.searchsorted(xs, pos[:, 0])
+    x1 = np.searchsorted(xs, pos_max[:, 0])
+    y0 = np.searchsorted(ys, pos[:, 1])
+    y1 = np.searchsorted(ys, pos_max[:, 1])
+    occupied_cells = table[y1, x1] - table[y0, x1] - table[y1, x0] + table[y0, x0]
+    return (occupied_cells == 0).tolist()
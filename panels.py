@@ -56,6 +56,9 @@ class PIXUNWRAP_PT_uv_tools(bpy.types.Panel):
         op.scale = 2
         op = row.operator("view3d.pixunwrap_resize_texture", text="Halve (÷2)")
         op.scale = 0.5
+        op = row.operator("view3d.pixunwrap_resize_texture", text="Downscale (÷2)")
+        op.scale = 0.5
+        op.downscale_filter = "SINC"
 
         content.label(text="Fill Colors")
         row = content.row(align=True)
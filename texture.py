@@ -1,4 +1,5 @@
 import bpy
+import numpy as np
 
 from itertools import cycle, islice
 from math import ceil, floor
@@ -7,20 +8,70 @@ from mathutils import Vector, Matrix
 from .common import RectInt, Vector2Int
 
 
+# Image.pixels supports foreach_get/foreach_set (fast access with
+# numpy arrays) since Blender 2.83
+HAS_PIXELS_FOREACH = bpy.app.version >= (2, 83, 0)
+
 
 def copy_texture_region(texture, src_pos, size, dst_pos):
-    src_pixels = PixelArray(blender_image=texture)
-    dst_pixels = PixelArray(blender_image=texture)
-    dst_pixels.copy_region(src_pixels, src_pos, size, dst_pos)
-    texture.pixels = dst_pixels.pixels
-    texture.update()
+    # Source and destination can be the same PixelArray,
+    # numpy copies overlapping regions as if through a temporary
+    pixels = PixelArray(blender_image=texture)
+    pixels.copy_region(pixels, src_pos, size, dst_pos)
+    pixels.write_to_image(texture)
 
 def copy_texture_region_transformed(texture, region:RectInt, transform:Matrix):
-    src_pixels = PixelArray(blender_image=texture)
-    dst_pixels = PixelArray(blender_image=texture)
-    dst_pixels.copy_region_transformed(src_pixels, region, transform)
-    texture.pixels = dst_pixels.pixels
-    texture.update()
+    pixels = PixelArray(blender_image=texture)
+    pixels.copy_region_transformed(pixels, region, transform)
+    pixels.write_to_image(texture)
+
+def windowed_sinc(x, support=3.0, window=1.5):
+    """
+    Sinc filter kernel with a gaussian window, zero outside of [-support, support].
+    A narrower window gives lower sidelobes (less ringing around hard edges)
+    at the cost of a slightly softer result.
+    """
+    return np.where(
+        np.abs(x) < support, np.sinc(x) * np.exp(-0.5 * (x / window) ** 2), 0
+    )
+
+
+def resample_taps(src_size, dst_size, support=3.0, window=1.5):
+    """
+    Find the source pixel indices and their weights for resampling
+    src_size pixels to dst_size pixels. Returns two arrays with one row
+    per destination pixel. Indices wrap around (mode repeat).
+    """
+    scale = dst_size / src_size
+    # When scaling down, stretch the kernel so that it covers all source pixels
+    stretch = max(1.0, 1.0 / scale)
+    radius = support * stretch
+    centers = (np.arange(dst_size) + 0.5) / scale - 0.5
+    first = np.ceil(centers - radius).astype(int)
+    indices = first[:, np.newaxis] + np.arange(int(floor(2 * radius)) + 1)
+    weights = windowed_sinc((indices - centers[:, np.newaxis]) / stretch, support, window)
+    weights /= weights.sum(axis=1, keepdims=True)
+    # Same type as the pixels, so filtering doesn't promote to float64
+    return indices % src_size, weights.astype(np.float32)
+
+
+def resample_axis(data, dst_size, axis):
+    """
+    Resample the pixel data along one axis (0 is rows, 1 is columns)
+    """
+    indices, weights = resample_taps(data.shape[axis], dst_size)
+    weight_shape = [1] * data.ndim
+    weight_shape[axis] = dst_size
+    out_shape = list(data.shape)
+    out_shape[axis] = dst_size
+    out = np.zeros(out_shape, dtype=np.float32)
+    # Accumulate one tap at a time, so there's never more than
+    # one extra image in memory.
+    for tap in range(indices.shape[1]):
+        out += data.take(indices[:, tap], axis=axis) * weights[:, tap].reshape(
+            weight_shape
+        )
+    return out
 
 
 class PixelArray:    
@@ -29,55 +80,97 @@ class PixelArray:
         if blender_image is not None:
             self.width = blender_image.size[0]
             self.height = blender_image.size[1]
-            self.pixels = list(blender_image.pixels[:])
-            assert (
-                len(self.pixels) == self.width * self.height * 4
-            ), "Pixels array is not the right size"
+            # Read straight into a float32 buffer, this is a single
+            # memcpy instead of creating a Python float for each channel
+            self.data = np.empty((self.height, self.width, 4), dtype=np.float32)
+            if HAS_PIXELS_FOREACH:
+                blender_image.pixels.foreach_get(self.pixels)
+            else:
+                self.pixels[:] = blender_image.pixels[:]
         elif size is not None:
             col_tl = tuple(bpy.context.scene.pixunwrap_texture_fill_color_tl) + (1,)
             col_tr = tuple(bpy.context.scene.pixunwrap_texture_fill_color_tr) + (1,)
             col_bl = tuple(bpy.context.scene.pixunwrap_texture_fill_color_bl) + (1,)
             col_br = tuple(bpy.context.scene.pixunwrap_texture_fill_color_br) + (1,)
             self.width = self.height = size
-            pixels = list()
-            for i in range(size * size):
-                row = i // size
-                col = i % size
-                left = (col % 16) < 8
-                top = (row % 16) < 8
-                light = (row + col) % 2 == 0
-                if left:
-                    if top:
-                        col = col_tl
-                    else:
-                        col = col_bl
-                else:
-                    if top:
-                        col = col_tr
-                    else:
-                        col = col_br
-
-                if not light:
-                    col = [c * 0.92 for c in col]
-                    col[3] = 1 # Fix alpha (we don't want to multiply that one with .7)
-                pixels.extend(col)
-
-            self.pixels = pixels  # list(islice(cycle(row_a + row_b), size * size * 4))
+
+            # Pick the color for each pixel by which (8 pixel) quadrant of
+            # the repeating 16x16 block it is in
+            rows = np.arange(size)[:, np.newaxis]
+            cols = np.arange(size)
+            top = (rows % 16) < 8
+            right = (cols % 16) >= 8
+            colors = np.array([[col_bl, col_br], [col_tl, col_tr]])
+            data = colors[top.astype(int), right.astype(int)]
+
+            # Darken every other pixel (not the alpha) for a checker pattern
+            light = (rows + cols) % 2 == 0
+            data[~light, :3] *= 0.92
+
+            self.data = data.astype(np.float32)
+
+    @property
+    def pixels(self):
+        """
+        Flat (RGBA RGBA ...) view of the pixel data, ordered like
+        blender's Image.pixels. Modifying it modifies this PixelArray.
+        """
+        return self.data.reshape(-1)
+
+    def write_to_image(self, image):
+        """
+        Write these pixels to the given blender image.
+        Image must have the same size as this PixelArray.
+        """
+        if HAS_PIXELS_FOREACH:
+            image.pixels.foreach_set(self.pixels)
+        else:
+            image.pixels[:] = self.pixels.tolist()
+        image.update()
+
+    def resize(self, width, height):
+        """
+        Change the size of this PixelArray, keeping the pixels in the
+        bottom left. Uses wrap mode repeat, so when growing, the
+        existing pixels are repeated to fill the new area.
+        """
+        self.data = self.data.take(np.arange(height), axis=0, mode="wrap").take(
+            np.arange(width), axis=1, mode="wrap"
+        )
+        self.width = width
+        self.height = height
+
+    def resample(self, width, height):
+        """
+        Scale the pixels of this PixelArray to a new size using a
+        (separable) windowed sinc filter, as opposed to resize(),
+        which crops or repeats.
+        """
+        # Filter with premultiplied alpha so that the color of
+        # transparent pixels doesn't bleed into their neighbors
+        data = self.data.copy()
+        data[..., :3] *= data[..., 3:]
+
+        data = resample_axis(data, height, axis=0)
+        data = resample_axis(data, width, axis=1)
+
+        # Filtering can ring to outside the valid range
+        np.clip(data, 0, 1, out=data)
+        alpha = data[..., 3:]
+        np.divide(data[..., :3], alpha, out=data[..., :3], where=alpha > 0)
+
+        self.data = data
+        self.width = width
+        self.height = height
 
     def get_pixel(self, x, y):
         # MODE = WRAP
-        x = x % self.width
-        y = y % self.height
-        idx = (y * self.width + x) * 4
         # RETURN R G B A
-        return tuple(self.pixels[idx : idx + 4])
+        return tuple(self.data[y % self.height, x % self.width])
 
     def set_pixel(self, x, y, pix):
-        x = x % self.width
-        y = y % self.height
-        idx = (y * self.width + x) * 4
         assert(len(pix) == 4)
-        self.pixels[idx:idx+4] = pix
+        self.data[y % self.height, x % self.width] = pix
 
     def copy_region(
         self,
@@ -90,13 +183,40 @@ class PixelArray:
         Copy a region of the source texture to this one.
         The source texture uses wrap mode repeat, so a larger area can be copied
         without error.
+        Destination pixels that fall outside of this texture are ignored.
         """
-        matrix = Matrix.Identity(3)
+        # Clamp the destination area to this texture
+        dst_min_x = max(0, dst_pos.x)
+        dst_min_y = max(0, dst_pos.y)
+        dst_max_x = min(self.width, dst_pos.x + size.x)
+        dst_max_y = min(self.height, dst_pos.y + size.y)
+        if dst_min_x >= dst_max_x or dst_min_y >= dst_max_y:
+            return
+
         offset = dst_pos - src_pos
-        src_rect = RectInt(src_pos, src_pos + size)
-        matrix[0][2]=offset.x
-        matrix[1][2]=offset.y
-        self.copy_region_transformed(source, src_rect, matrix)
+        src_min_x = dst_min_x - offset.x
+        src_min_y = dst_min_y - offset.y
+        src_max_x = dst_max_x - offset.x
+        src_max_y = dst_max_y - offset.y
+
+        # Copy the whole region at once instead of pixel by pixel
+        if (
+            src_min_x >= 0
+            and src_min_y >= 0
+            and src_max_x <= source.width
+            and src_max_y <= source.height
+        ):
+            # Source area is inside the source texture, plain slices will do
+            self.data[dst_min_y:dst_max_y, dst_min_x:dst_max_x] = source.data[
+                src_min_y:src_max_y, src_min_x:src_max_x
+            ]
+        else:
+            # Source rows/columns for the destination area, wrapped around
+            src_x = np.arange(src_min_x, src_max_x) % source.width
+            src_y = np.arange(src_min_y, src_max_y) % source.height
+            self.data[dst_min_y:dst_max_y, dst_min_x:dst_max_x] = source.data[
+                src_y[:, np.newaxis], src_x
+            ]
 
 
     def copy_region_transformed(
@@ -105,7 +225,7 @@ class PixelArray:
         src_rect: RectInt,
         transform: "Matrix",
     ):
-        original_pixels_len = len(self.pixels)
+        original_pixels_len = self.data.size
 
         # Determine bounds of the destination area
         # Add a half because we really only want to copy from the centers
@@ -141,12 +261,31 @@ class PixelArray:
         # src-bounds (so we inverse transform it)
         inv_transform = transform.inverted()
 
-        for y in range(dst_min_y, dst_max_y):
-            for x in range(dst_min_x, dst_max_x):
-                src_point = inv_transform @ Vector((x+.5, y+.5, 1))
-                # Nearest neighbor interpolation: 
-                pix = source.get_pixel(floor(src_point.x), floor(src_point.y))
-                self.set_pixel(x, y, pix)
+        if dst_min_x >= dst_max_x or dst_min_y >= dst_max_y:
+            return
+
+        # Inverse transform the centers of all destination pixels at once,
+        # as a grid of source x and y coordinates
+        (a, b, c), (d, e, f) = inv_transform[0], inv_transform[1]
+        xs = np.arange(dst_min_x, dst_max_x) + 0.5
+        ys = np.arange(dst_min_y, dst_max_y) + 0.5
+        # Nearest neighbor interpolation (and wrap mode repeat)
+        if b == 0 and d == 0:
+            # Scale/flip only: source columns only depend on x, rows on y
+            src_x = np.floor(a * xs + c).astype(np.intp) % source.width
+            src_y = np.floor(e * ys + f).astype(np.intp) % source.height
+            region = source.data[np.ix_(src_y, src_x)]
+        elif a == 0 and e == 0:
+            # (90 degree) rotations: source columns only depend on y, rows on x
+            src_x = np.floor(b * ys + c).astype(np.intp) % source.width
+            src_y = np.floor(d * xs + f).astype(np.intp) % source.height
+            region = source.data[np.ix_(src_y, src_x)].swapaxes(0, 1)
+        else:
+            src_x = np.floor(a * xs + b * ys[:, np.newaxis] + c).astype(np.intp)
+            src_y = np.floor(d * xs + e * ys[:, np.newaxis] + f).astype(np.intp)
+            region = source.data[src_y % source.height, src_x % source.width]
+
+        self.data[dst_min_y:dst_max_y, dst_min_x:dst_max_x] = region
 
         # # DO SOME BOUNDS CHECKS CAUSE YOU KNOW
         # dst_max = dst_pos + size - 1
@@ -163,5 +302,5 @@ class PixelArray:
         #         self.set_pixel(write_pos, *source.get_pixel(read_pos))
 
         assert (
-            len(self.pixels) == original_pixels_len
+            self.data.size == original_pixels_len
         ), f"Pixel Array was resized (from {original_pixels_len} to {len(self.pixels)}). That's a NOPE"
\ No newline at end of file